@@ -192,11 +192,11 @@ class QuerySearchSystemEnhanced:
         
         return all_queries
     
-    def search_articles_for_query(self, query_entities: List[Dict], top_k=10):
-        """Search articles cho một query với weighted entities"""
+    def build_search_query(self, query_entities: List[Dict], top_k=10):
+        """Build weighted entity search query body (None nếu không có entity hợp lệ)"""
         if not query_entities:
-            return []
-        
+            return None
+
         should_queries = []
         
         # Tạo weighted queries cho mỗi entity
@@ -289,10 +289,10 @@ class QuerySearchSystemEnhanced:
                 should_queries.append(bonus_weighted_query)
         
         if not should_queries:
-            return []
-        
+            return None
+
         # Main search query
-        search_query = {
+        return {
             "query": {
                 "bool": {
                     "should": should_queries,
@@ -307,7 +307,27 @@ class QuerySearchSystemEnhanced:
                 }
             }
         }
-        
+
+    def _parse_search_hits(self, hits: List[Dict]) -> List[Dict]:
+        """Convert ES hits thành search result format chung"""
+        search_results = []
+        for i, hit in enumerate(hits, 1):
+            article_data = hit["_source"]
+            search_results.append({
+                "rank": i,
+                "article_id": article_data["article_id"],
+                "score": hit["_score"],
+                "entities": article_data.get("entities", []),
+                "highlights": hit.get("highlight", {})
+            })
+        return search_results
+
+    def search_articles_for_query(self, query_entities: List[Dict], top_k=10):
+        """Search articles cho một query với weighted entities"""
+        search_query = self.build_search_query(query_entities, top_k=top_k)
+        if search_query is None:
+            return []
+
         try:
             response = requests.post(
                 f"{self.es_host}/{self.articles_index}/_search",
@@ -317,27 +337,50 @@ class QuerySearchSystemEnhanced:
             
             if response.status_code == 200:
                 result = response.json()
-                hits = result["hits"]["hits"]
-                
-                search_results = []
-                for i, hit in enumerate(hits, 1):
-                    article_data = hit["_source"]
-                    search_results.append({
-                        "rank": i,
-                        "article_id": article_data["article_id"],
-                        "score": hit["_score"],
-                        "entities": article_data.get("entities", []),
-                        "highlights": hit.get("highlight", {})
-                    })
-                
-                return search_results
+                return self._parse_search_hits(result["hits"]["hits"])
             else:
                 print(f" Search error: {response.status_code}")
                 return []
-                
+
         except Exception as e:
             print(f" Lỗi search: {e}")
             return []
+
+    def msearch_articles_for_queries(self, entities_batch: List[List[Dict]], top_k=10) -> List[List[Dict]]:
+        """
+        Batch search nhiều queries trong 1 request bằng ES _msearch API
+        (newline-delimited header/body pairs). Giảm network round-trips
+        đáng kể so với 1 request/query.
+        """
+        body_lines = []
+        send_positions = []
+        for pos, query_entities in enumerate(entities_batch):
+            search_query = self.build_search_query(query_entities, top_k=top_k)
+            if search_query is None:
+                continue  # Query không có entities - trả [] luôn, không gửi lên ES
+            send_positions.append(pos)
+            body_lines.append(json.dumps({"index": self.articles_index}))
+            body_lines.append(json.dumps(search_query))
+
+        results = [[] for _ in entities_batch]
+        if not body_lines:
+            return results
+
+        response = requests.post(
+            f"{self.es_host}/_msearch",
+            headers={"Content-Type": "application/x-ndjson"},
+            data="\n".join(body_lines) + "\n"
+        )
+
+        if response.status_code != 200:
+            raise RuntimeError(f"msearch error: {response.status_code}")
+
+        # Responses trả về theo đúng thứ tự gửi đi
+        for pos, item in zip(send_positions, response.json().get("responses", [])):
+            hits = item.get("hits", {}).get("hits", [])
+            results[pos] = self._parse_search_hits(hits)
+
+        return results
     
     def auto_fill_empty_cells(self, df: pd.DataFrame, top_k: int = 10, fill_value: str = "#") -> pd.DataFrame:
         """
@@ -369,7 +412,8 @@ class QuerySearchSystemEnhanced:
     
     def search_all_queries_and_save(self, output_submission_csv="submission.csv", 
                                    top_k=10, auto_fill=True, 
-                                   max_queries=None, postfix=""):
+                                   max_queries=None, postfix="",
+                                   use_msearch=True, batch_size=32):
         """
         Search tất cả queries và save kết quả submission CSV
         Args:
@@ -378,6 +422,8 @@ class QuerySearchSystemEnhanced:
             auto_fill: Tự động fill empty cells (default: True)
             max_queries: Giới hạn số queries để test (default: None = tất cả)
             postfix: Thêm postfix vào tên file
+            use_msearch: Batch queries qua ES _msearch API (default: True)
+            batch_size: Số queries mỗi _msearch request (default: 32)
         """
         print(" BẮT ĐẦU ENHANCED QUERY SEARCH")
         print("=" * 50)
@@ -414,6 +460,8 @@ class QuerySearchSystemEnhanced:
             print(f" Limited to first {max_queries:,} queries")
         
         print(f" Total queries to process: {total_queries:,}")
+        if use_msearch:
+            print(f" Using _msearch batching (batch size: {batch_size})")
         
         # Search từng query
         submission_data = []
@@ -421,76 +469,101 @@ class QuerySearchSystemEnhanced:
         successful_queries = 0
         total_articles_found = 0
         
-        for i, query in enumerate(all_queries, 1):
-            # Progress tracking
-            if i % 50 == 0 or i == total_queries:
-                elapsed = time.time() - start_time
-                avg_time = elapsed / i
-                eta = avg_time * (total_queries - i)
-                print(f" Progress: {i:,}/{total_queries:,} ({i/total_queries*100:.1f}%) - ETA: {eta/60:.1f}min")
-            
-            query_id = query["query_id"]
-            query_entities = query["entities"]
-            
-            try:
-                # Search articles
-                search_results = self.search_articles_for_query(query_entities, top_k=top_k)
-                
-                if search_results:
-                    successful_queries += 1
-                    total_articles_found += len(search_results)
+        for batch_start in range(0, total_queries, batch_size):
+            batch = all_queries[batch_start:batch_start + batch_size]
+
+            # Batch search qua _msearch (fallback về per-query search nếu lỗi)
+            batch_results = None
+            if use_msearch:
+                try:
+                    batch_results = self.msearch_articles_for_queries(
+                        [q["entities"] for q in batch], top_k=top_k
+                    )
+                except Exception as e:
+                    print(f" Lỗi msearch batch (fallback per-query): {e}")
+                    batch_results = None
+
+            for offset, query in enumerate(batch):
+                i = batch_start + offset + 1
+                # Progress tracking
+                if i % 50 == 0 or i == total_queries:
+                    elapsed = time.time() - start_time
+                    avg_time = elapsed / i
+                    eta = avg_time * (total_queries - i)
+                    print(f" Progress: {i:,}/{total_queries:,} ({i/total_queries*100:.1f}%) - ETA: {eta/60:.1f}min")
+
+                query_id = query["query_id"]
+                query_entities = query["entities"]
+
+                try:
+                    # Search articles
+                    if batch_results is not None:
+                        search_results = batch_results[offset]
+                    else:
+                        search_results = self.search_articles_for_query(query_entities, top_k=top_k)
                     
-                    # Tạo submission row
-                    submission_row = {"query_id": query_id}
-                    for j in range(1, top_k + 1):
-                        if j <= len(search_results):
-                            submission_row[f"article_id_{j}"] = search_results[j-1]["article_id"]
-                        else:
+                    if search_results:
+                        successful_queries += 1
+                        total_articles_found += len(search_results)
+
+                        # Tạo submission row
+                        submission_row = {"query_id": query_id}
+                        for j in range(1, top_k + 1):
+                            if j <= len(search_results):
+                                submission_row[f"article_id_{j}"] = search_results[j-1]["article_id"]
+                            else:
+                                submission_row[f"article_id_{j}"] = ""
+                        submission_data.append(submission_row)
+                    else:
+                        # Không có kết quả
+                        failed_queries.append(query_id)
+
+                        # Tạo empty submission row
+                        submission_row = {"query_id": query_id}
+                        for j in range(1, top_k + 1):
                             submission_row[f"article_id_{j}"] = ""
-                    submission_data.append(submission_row)
-                else:
-                    # Không có kết quả
+                        submission_data.append(submission_row)
+
+                except Exception as e:
+                    print(f" Lỗi search query {query_id}: {e}")
                     failed_queries.append(query_id)
-                    
-                    # Tạo empty submission row
+
+                    # Tạo empty submission row cho failed query
                     submission_row = {"query_id": query_id}
                     for j in range(1, top_k + 1):
                         submission_row[f"article_id_{j}"] = ""
                     submission_data.append(submission_row)
-                    
-            except Exception as e:
-                print(f" Lỗi search query {query_id}: {e}")
-                failed_queries.append(query_id)
-                
-                # Tạo empty submission row cho failed query
-                submission_row = {"query_id": query_id}
-                for j in range(1, top_k + 1):
-                    submission_row[f"article_id_{j}"] = ""
-                submission_data.append(submission_row)
         
         total_time = time.time() - start_time
         
-        # Save submission CSV với auto-fill
+        # Save submission CSV - stream write bằng csv.writer (không cần DataFrame)
         try:
-            submission_df = pd.DataFrame(submission_data)
-            
-            # Ensure proper column order
             fieldnames = ["query_id"] + [f"article_id_{i}" for i in range(1, top_k + 1)]
-            submission_df = submission_df.reindex(columns=fieldnames, fill_value="")
-            
-            # Auto-fill empty cells if requested
+            fill_value = "#" if auto_fill else ""
+            empty_cells = 0
+            total_cells = 0
+
+            with open(output_submission_csv, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+                writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
+                writer.writerow(fieldnames)
+                for submission_row in submission_data:
+                    row = []
+                    for col in fieldnames:
+                        value = submission_row.get(col, "")
+                        if value is None or value == "":
+                            value = fill_value
+                            empty_cells += 1
+                        row.append(value)
+                    total_cells += len(row)
+                    writer.writerow(row)
+
             if auto_fill:
-                submission_df = self.auto_fill_empty_cells(submission_df, top_k, fill_value="#")
                 print(f" Auto-filled empty cells with '#'")
-            
-            submission_df.to_csv(output_submission_csv, index=False)
             print(f" Saved submission CSV: {output_submission_csv}")
-            
+
             # Verification
-            empty_cells = (submission_df == "").sum().sum() if not auto_fill else (submission_df == "#").sum().sum()
-            total_cells = submission_df.size
             print(f" Empty/filled cells: {empty_cells:,}/{total_cells:,} ({empty_cells/total_cells*100:.1f}%)")
-            
+
         except Exception as e:
             print(f" Lỗi save submission CSV: {e}")
         
@@ -49,6 +49,14 @@ def load_submission_file(postfix):
     df = pd.read_csv(filepath)
     return df
 
+def load_csv_file(filepath):
+    """Load 1 CSV file thành string-typed DataFrame (na_filter off - cells rỗng giữ nguyên '')"""
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"File {filepath} not found")
+
+    print(f"Loading {filepath}...")
+    return pd.read_csv(filepath, engine="c", dtype=str, na_filter=False)
+
 def perform_rrf_reranking_adaptive(postfixes, k=60, top_n=None):
     """
     Perform RRF reranking với adaptive filtering - mỗi query sẽ tìm số lượng article 
@@ -62,18 +70,32 @@ def perform_rrf_reranking_adaptive(postfixes, k=60, top_n=None):
     Returns:
         Tuple: (DataFrame with reranked results, skipped_queries_count)
     """
-    # Load all submission files
-    dfs = []
-    article_col_counts = []
+    dfs = [load_submission_file(postfix) for postfix in postfixes]
+    names = [f"submission_{postfix}.csv" for postfix in postfixes]
+    return perform_rrf_reranking_adaptive_from_frames(dfs, k, top_n, names=names)
+
+def perform_rrf_reranking_adaptive_from_frames(dfs, k=60, top_n=None, names=None):
+    """
+    Adaptive RRF reranking trên DataFrames đã load sẵn (không đọc lại từ disk)
     
-    for postfix in postfixes:
-        df = load_submission_file(postfix)
-        dfs.append(df)
-        
+    Args:
+        dfs: List of submission DataFrames
+        k: RRF parameter (default: 60)
+        top_n: Number of top articles to output (None = auto-detect from input files)
+        names: Optional display names cho từng input (dùng trong log)
+    
+    Returns:
+        Tuple: (DataFrame with reranked results, skipped_queries_count)
+    """
+    if names is None:
+        names = [f"input_{i+1}" for i in range(len(dfs))]
+
+    article_col_counts = []
+    for name, df in zip(names, dfs):
         # Count article columns in this file
         article_cols = [col for col in df.columns if col.startswith('article_id_') or col.startswith('image_id_')]
         article_col_counts.append(len(article_cols))
-        print(f"  File submission_{postfix}.csv has {len(article_cols)} article columns")
+        print(f"  File {name} has {len(article_cols)} article columns")
     
     # Determine output size
     if top_n is None:
@@ -133,7 +155,7 @@ def perform_rrf_reranking_adaptive(postfixes, k=60, top_n=None):
         if not all(valid_files):
             skipped_queries += 1
             if idx <= 10:
-                empty_files = [f"submission_{postfixes[i]}.csv" for i, is_valid in enumerate(valid_files) if not is_valid]
+                empty_files = [names[i] for i, is_valid in enumerate(valid_files) if not is_valid]
                 print(f"   Skipping query {query_id} - empty/missing in: {', '.join(empty_files)}")
             
             # Create empty result row
@@ -213,18 +235,32 @@ def perform_rrf_reranking(postfixes, k=60, top_n=None):
     Returns:
         Tuple: (DataFrame with reranked results, skipped_queries_count)
     """
-    # Load all submission files
-    dfs = []
-    article_col_counts = []
+    dfs = [load_submission_file(postfix) for postfix in postfixes]
+    names = [f"submission_{postfix}.csv" for postfix in postfixes]
+    return perform_rrf_reranking_from_frames(dfs, k, top_n, names=names)
+
+def perform_rrf_reranking_from_frames(dfs, k=60, top_n=None, names=None):
+    """
+    RRF reranking (anti-bias mode) trên DataFrames đã load sẵn
     
-    for postfix in postfixes:
-        df = load_submission_file(postfix)
-        dfs.append(df)
-        
+    Args:
+        dfs: List of submission DataFrames
+        k: RRF parameter (default: 60)
+        top_n: Number of top articles to output (None = auto-detect from input files)
+        names: Optional display names cho từng input (dùng trong log)
+    
+    Returns:
+        Tuple: (DataFrame with reranked results, skipped_queries_count)
+    """
+    if names is None:
+        names = [f"input_{i+1}" for i in range(len(dfs))]
+
+    article_col_counts = []
+    for name, df in zip(names, dfs):
         # Count article columns in this file
         article_cols = [col for col in df.columns if col.startswith('article_id_') or col.startswith('image_id_')]
         article_col_counts.append(len(article_cols))
-        print(f"  File submission_{postfix}.csv has {len(article_cols)} article columns")
+        print(f"  File {name} has {len(article_cols)} article columns")
     
     # Determine output size
     if top_n is None:
@@ -286,7 +322,7 @@ def perform_rrf_reranking(postfixes, k=60, top_n=None):
         if not query_has_results_in_all_files:
             skipped_queries += 1
             if idx <= 10:  # Log first few skipped queries
-                empty_files = [f"submission_{postfixes[i]}.csv" for i, has_results in enumerate(file_has_valid_articles) if not has_results]
+                empty_files = [names[i] for i, has_results in enumerate(file_has_valid_articles) if not has_results]
                 print(f"   Skipping query {query_id} - empty/missing in: {', '.join(empty_files)}")
             
             # Create empty result row
@@ -385,8 +421,9 @@ def main():
         current_datetime = datetime.now().strftime('%Y%m%d_%H%M%S')
         output_filename = f"ReRank/sb_rrank_{mode_suffix}_{current_datetime}.csv"
         
-        # Save result
-        result_df.to_csv(output_filename, index=False)
+        # Save result - buffered stream write, na_rep thay cho fillna copy
+        with open(output_filename, 'w', buffering=1 << 20, newline='') as f:
+            result_df.to_csv(f, index=False, chunksize=50_000, na_rep='#')
         
         print(f"\n=== Results ===")
         print(f"Total queries processed: {len(result_df)}")